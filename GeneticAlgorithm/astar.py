@@ -1,6 +1,7 @@
 import copy
 import random
 import string
+from array import array
 
 
 class Node:
@@ -28,8 +29,47 @@ class Node:
         return abs(self.x - other.x) + abs(self.y - other.y)
         
 
+class Adjacency:
+    """Compressed sparse row (CSR) neighbour table of a CityMap, built once.
+
+    Cells are numbered ``u = x * w + y``. The neighbours of ``u`` are
+    ``targets[offsets[u]:offsets[u + 1]]`` (N, E, S, W order) and ``costs``
+    holds the base cost of entering each of them. Blocked cells have no edges.
+    """
+    def __init__(self, city, blocked=None):
+        h, w = city.h, city.w
+        self.blocked = array('b', bytes(h * w))
+        for i in range(h):
+            for j in range(w):
+                node = city.map[i][j]
+                if node is None or node.cost is None: # walls and unknown cells are impassable
+                    self.blocked[i * w + j] = 1
+        for i, j in blocked or ():
+            if not (0 <= i < h and 0 <= j < w):
+                raise ValueError(f"Blocked cell {(i, j)} is outside the map!")
+            self.blocked[i * w + j] = 1
+
+        self.offsets = array('l', [0])
+        self.targets = array('l')
+        self.costs = array('l')
+        for i in range(h):
+            for j in range(w):
+                if not self.blocked[i * w + j]:
+                    for a, b in ((i-1, j), (i, j+1), (i+1, j), (i, j-1)):
+                        if 0 <= a < h and 0 <= b < w and not self.blocked[a * w + b]:
+                            self.targets.append(a * w + b)
+                            self.costs.append(city.map[a][b].cost)
+                self.offsets.append(len(self.targets))
+
+    def __deepcopy__(self, memo): # read-only once built, so copies of the city can share it
+        return self
+
+    def edges(self, u):
+        return range(self.offsets[u], self.offsets[u + 1])
+
+
 class CityMap:
-    def __init__(self):
+    def __init__(self, blocked=None):
         self.goal_states = []
         self.init_states = []
         self.node_index: dict[str, Node] = dict()
@@ -63,18 +103,30 @@ class CityMap:
                         self.init_states.append(new_node.id)
 
                     self.node_index[new_node.id] = new_node
+
+        self.build_adjacency(blocked)
     
+    def build_adjacency(self, blocked=None):
+        self.cells: list[Node] = [node for row in self.map for node in row]
+        self.adjacency = adj = Adjacency(self, blocked)
+        self.neighbours: list[tuple[Node, ...]] = [ # one shared tuple per cell, read straight from the CSR rows
+            tuple(self.cells[v] for v in adj.targets[adj.offsets[u]:adj.offsets[u + 1]])
+            for u in range(self.h * self.w)
+        ]
+
     def expand_node(self, x, y):
-        dirs = [(x-1, y), (x, y+1), (x+1, y), (x, y-1)]
-        children: list[Node] = []
-        for i, j in dirs:
-            if i < 0 or j < 0: # Bypass Python's reverse indexing feature
-                continue
-            try: 
-                children.append(self.map[i][j])
-            except IndexError: # Skip out or range indices
-                continue
-        return children
+        return self.neighbours[x * self.w + y]
+
+    def __deepcopy__(self, memo): # topology is shared, only the Nodes (which polish_map edits) are copied
+        new = copy.copy(self)
+        memo[id(self)] = new
+        new.cells = [copy.copy(node) for node in self.cells]
+        new.map = [new.cells[i * self.w:(i + 1) * self.w] for i in range(self.h)]
+        new.node_index = {node_id: new.cells[node.x * self.w + node.y] for node_id, node in self.node_index.items()}
+        new.goal_states = self.goal_states[:]
+        new.init_states = self.init_states[:]
+        new.neighbours = [tuple(new.cells[v.x * self.w + v.y] for v in row) for row in self.neighbours]
+        return new
 
     def polish_map(self, new_init: tuple[int, int], new_goal: tuple[int, int]):
         for i in range(self.h):
@@ -138,8 +190,7 @@ class Path:
     
     def expand_latest(self):
         latest = self.nodes[-1]
-        children = self.city.expand_node(latest.x, latest.y)
-        children.append(latest)
+        children = self.city.expand_node(latest.x, latest.y) + (latest,)
         new_paths = []
         for node in children:
             if node.id == latest.id: # STAY should be considered
@@ -148,7 +199,9 @@ class Path:
             # if node.id in [n.id for n in self.nodes]: # Do not consider nodes that are already visited,
                 continue
 
-            new_path = copy.deepcopy(self)
+            new_path = copy.copy(self) # the city and its nodes are never modified by a search, so share them
+            new_path.nodes = self.nodes[:]
+            new_path.goals_reached = self.goals_reached[:]
             new_path.add_node(node)
             new_paths.append(new_path)
         
@@ -0,0 +1,253 @@
+import heapq
+from array import array
+from classes import CityMap, Path
+
+
+TILE_SIZE = 16
+ENTRANCE_GAP = 6 # long open borders get an extra entrance every ENTRANCE_GAP cells
+
+
+class HierarchicalMap:
+    """HPA*-style abstraction of a CityMap for routing on large grids.
+
+    The grid is cut into ``tile`` x ``tile`` tiles. Each open stretch of a
+    tile border gets one or more entrances, and the costs between entrances
+    of the same tile are precomputed once. A query searches this abstract
+    graph first and then refines only the tiles on the chosen corridor.
+
+    Suboptimality is bounded by ``entrance_gap`` (k) and ``weight``. On an
+    open border stretch every cell is at most k // 2 cells from an entrance,
+    so moving one border crossing of an optimal route to its nearest entrance
+    adds at most ``crossing_detour = 2 * (k // 2) * max_cost``. The static
+    route cost is therefore at most
+    ``weight * (optimum + crossings * crossing_detour)``, see ``cost_bound``,
+    where ``crossings`` counts the tile borders the optimal route crosses.
+    ``entrance_gap=1`` gives ``weight`` times the optimum.
+
+    Start and goal in the same or neighbouring tiles are also searched
+    directly over the tiles around them, so short trips are not forced
+    through a distant entrance. The search
+    itself uses the static base costs from ``city.adjacency``; the returned
+    ``Path`` replays its cells through ``Path.add_node``, so its ``cost``
+    includes red traffic lights like the paths in ``main.py``.
+    """
+    def __init__(self, city: CityMap, tile=TILE_SIZE, entrance_gap=ENTRANCE_GAP, weight=1.0):
+        if tile < 1 or entrance_gap < 1:
+            raise ValueError("tile and entrance_gap must be positive")
+        if weight < 1:
+            raise ValueError("weight must be at least 1")
+
+        self.city = city
+        self.tile = tile
+        self.entrance_gap = entrance_gap
+        self.weight = weight
+        adj = city.adjacency
+        self.min_cost = min(adj.costs) if len(adj.costs) else 0 # keeps the abstract heuristic admissible
+        self.max_cost = max(adj.costs) if len(adj.costs) else 0
+        self.crossing_detour = 2 * (entrance_gap // 2) * self.max_cost # worst extra cost per border crossing
+
+        self.entrances: dict[tuple[int, int], set[int]] = dict()
+        self.edges: dict[int, list[tuple[int, int]]] = dict() # abstract graph: cell -> [(cell, cost)]
+        self._label_components()
+        self._build_entrances()
+        for tile_id, cells in self.entrances.items():
+            bounds = self.tile_bounds(tile_id)
+            for u in cells:
+                reachable = {v for v in cells if self.component[v] == self.component[u]}
+                dist, _ = self._dijkstra(u, bounds, targets=reachable)
+                for v in reachable:
+                    if v != u:
+                        self.edges[u].append((v, dist[v]))
+
+    def cost_bound(self, optimum, crossings):
+        # Upper bound on the static cost of route() given the optimal static cost and its border crossings
+        return self.weight * (optimum + crossings * self.crossing_detour)
+
+    def tile_of(self, u):
+        return (u // self.city.w // self.tile, u % self.city.w // self.tile)
+
+    def tile_bounds(self, tile_id):
+        x0, y0 = tile_id[0] * self.tile, tile_id[1] * self.tile
+        return x0, y0, min(x0 + self.tile, self.city.h), min(y0 + self.tile, self.city.w)
+
+    def _label_components(self):
+        # Connected components inside each tile, so each entrance only waits for the entrances it can reach
+        h, w = self.city.h, self.city.w
+        adj = self.city.adjacency
+        self.component = array('l', [-1]) * (h * w)
+        label = 0
+        for u in range(h * w):
+            if adj.blocked[u] or self.component[u] != -1:
+                continue
+            x0, y0, x1, y1 = self.tile_bounds(self.tile_of(u))
+            self.component[u] = label
+            stack = [u]
+            while stack:
+                a = stack.pop()
+                for e in adj.edges(a):
+                    b = adj.targets[e]
+                    if self.component[b] == -1 and x0 <= b // w < x1 and y0 <= b % w < y1:
+                        self.component[b] = label
+                        stack.append(b)
+            label += 1
+
+    def _add_transition(self, u, v):
+        for a, b in ((u, v), (v, u)):
+            self.entrances.setdefault(self.tile_of(a), set()).add(a)
+            self.edges.setdefault(a, []).append((b, self.city.cells[b].cost))
+
+    def _build_entrances(self):
+        h, w, blocked = self.city.h, self.city.w, self.city.adjacency.blocked
+        # Each border between neighbouring tiles is a list of (u, step):
+        # u and u + step are the two cells facing each other across it
+        borders = []
+        for x in range(self.tile, h, self.tile): # horizontal borders
+            for y0 in range(0, w, self.tile):
+                borders.append([((x - 1) * w + y, w) for y in range(y0, min(y0 + self.tile, w))])
+        for y in range(self.tile, w, self.tile): # vertical borders
+            for x0 in range(0, h, self.tile):
+                borders.append([(x * w + y - 1, 1) for x in range(x0, min(x0 + self.tile, h))])
+
+        for border in borders:
+            run = []
+            for u, step in border + [(None, None)]: # sentinel closes the last run
+                if u is not None and not blocked[u] and not blocked[u + step]:
+                    run.append((u, step))
+                    continue
+                if len(run) > self.entrance_gap:
+                    picks = sorted(set(range(0, len(run), self.entrance_gap)) | {len(run) - 1})
+                else:
+                    picks = [len(run) // 2] if run else []
+                for k in picks:
+                    a, s = run[k]
+                    self._add_transition(a, a + s)
+                run = []
+
+    def _dijkstra(self, source, bounds, targets=None, reverse=False):
+        # Plain Dijkstra over the CSR adjacency, restricted to the cells inside bounds.
+        # With reverse=True dist[u] is the cost from u to source instead of source to u.
+        adj, cells, w = self.city.adjacency, self.city.cells, self.city.w
+        x0, y0, x1, y1 = bounds
+        remaining = set(targets) if targets is not None else None
+        dist = {source: 0}
+        parent = {source: None}
+        heap = [(0, source)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            if remaining is not None:
+                remaining.discard(u)
+                if not remaining:
+                    break
+            for e in adj.edges(u):
+                v = adj.targets[e]
+                if not (x0 <= v // w < x1 and y0 <= v % w < y1):
+                    continue
+                nd = d + (cells[u].cost if reverse else adj.costs[e])
+                if nd < dist.get(v, nd + 1):
+                    dist[v] = nd
+                    parent[v] = u
+                    heapq.heappush(heap, (nd, v))
+
+        return dist, parent
+
+    def _abstract_search(self, s, g):
+        # Temporarily hook start and goal into the abstract graph through their own tiles.
+        w = self.city.w
+        s_tile, g_tile = self.tile_of(s), self.tile_of(g)
+        s_dist, _ = self._dijkstra(s, self.tile_bounds(s_tile), targets=self.entrances.get(s_tile, set()) | {g})
+        g_dist, _ = self._dijkstra(g, self.tile_bounds(g_tile), targets=self.entrances.get(g_tile, set()) | {s}, reverse=True)
+        start_edges = [(v, s_dist[v]) for v in self.entrances.get(s_tile, ()) if v in s_dist]
+        if s_tile == g_tile and g in s_dist:
+            start_edges.append((g, s_dist[g]))
+        goal_edges = {u: g_dist[u] for u in self.entrances.get(g_tile, ()) if u in g_dist}
+
+        gx, gy = g // w, g % w
+        def huristic(u):
+            return self.weight * self.min_cost * (abs(u // w - gx) + abs(u % w - gy))
+
+        cost = {s: 0}
+        parent = {s: None}
+        heap = [(huristic(s), s)]
+        closed = set()
+        while heap:
+            _, u = heapq.heappop(heap)
+            if u in closed:
+                continue
+            if u == g:
+                corridor = []
+                while u is not None:
+                    corridor.append(u)
+                    u = parent[u]
+                return cost[g], corridor[::-1]
+            closed.add(u)
+
+            neighbours = list(self.edges.get(u, ()))
+            if u == s: # start may itself be an entrance, keep its transitions too
+                neighbours += start_edges
+            if u in goal_edges:
+                neighbours = neighbours + [(g, goal_edges[u])]
+            for v, c in neighbours:
+                nc = cost[u] + c
+                if v not in closed and nc < cost.get(v, nc + 1):
+                    cost[v] = nc
+                    parent[v] = u
+                    heapq.heappush(heap, (nc + huristic(v), v))
+
+        return None, None
+
+    def _walk(self, parent, u, v):
+        # Cells from u (excluded) to v (included) along a Dijkstra parent map.
+        steps = []
+        while v != u:
+            steps.append(v)
+            v = parent[v]
+        return steps[::-1]
+
+    def _refine(self, u, v):
+        # Expand one abstract edge back into grid cells (u excluded, v included).
+        if self.tile_of(u) != self.tile_of(v): # inter-tile transition is a single step
+            return [v]
+        _, parent = self._dijkstra(u, self.tile_bounds(self.tile_of(u)), targets={v})
+        return self._walk(parent, u, v)
+
+    def _nearby_search(self, s, g):
+        # Direct search over the tiles around start and goal, only used when they are close.
+        (sx, sy), (gx, gy) = self.tile_of(s), self.tile_of(g)
+        if abs(sx - gx) > 1 or abs(sy - gy) > 1:
+            return None, None
+        bounds = (
+            max(0, (min(sx, gx) - 1) * self.tile), max(0, (min(sy, gy) - 1) * self.tile),
+            min(self.city.h, (max(sx, gx) + 2) * self.tile), min(self.city.w, (max(sy, gy) + 2) * self.tile),
+        )
+        dist, parent = self._dijkstra(s, bounds, targets={g})
+        if g not in dist:
+            return None, None
+        return dist[g], [s] + self._walk(parent, s, g)
+
+    def route(self, start: tuple[int, int], goal: tuple[int, int]):
+        h, w, blocked = self.city.h, self.city.w, self.city.adjacency.blocked
+        for x, y in (start, goal):
+            if not (0 <= x < h and 0 <= y < w):
+                raise ValueError(f"Cell {(x, y)} is outside the map!")
+        s = start[0] * w + start[1]
+        g = goal[0] * w + goal[1]
+        if blocked[s] or blocked[g]:
+            raise ValueError("Start or goal is on a blocked cell!")
+
+        cost, cells = self._nearby_search(s, g)
+        abstract_cost, corridor = self._abstract_search(s, g)
+        if corridor is not None and (cost is None or abstract_cost < cost):
+            cost = abstract_cost
+            cells = [s]
+            for u, v in zip(corridor, corridor[1:]):
+                cells.extend(self._refine(u, v))
+        if cells is None:
+            raise ValueError(f"No route from {start} to {goal}!")
+
+        # The search ranks routes by static cost; replay the cells so cost and f follow Path's rules (red lights included)
+        path = Path(city=self.city, nodes=[self.city.cells[s]], cost=1)
+        for u in cells[1:]:
+            path.add_node(self.city.cells[u])
+        return path
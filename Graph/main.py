@@ -1,4 +1,5 @@
 from classes import *
+from hierarchy import HierarchicalMap
 import sys
 
 def ALGORITHM(city: CityMap, style):
@@ -58,6 +59,13 @@ def main():
     print()
     print("###############################       A*")
     print(result_astar)
+
+    hmap = HierarchicalMap(city)
+    for goal_id in city.goal_states:
+        goal = city.node_index[goal_id]
+        print()
+        print(f"###############################       HPA* to {goal}")
+        print(hmap.route(city.start, (goal.x, goal.y)))
     
     # path = [(0, 0), (1, 0), (2, 0), (2, 1), (2, 2), (2, 3), (1, 3)]
     # nodes = []
@@ -0,0 +1,68 @@
+import copy
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__)) # the Graph modules import each other as top-level scripts
+from classes import CityMap
+
+
+def make_city(rows, blocked=None):
+    return CityMap(len(rows), len(rows[0]), (0, 0), [list(row) for row in rows], blocked=blocked)
+
+
+def old_expand_node(city, x, y):
+    # expand_node before the adjacency table: N, E, S, W with out-of-range cells skipped
+    children = []
+    for i, j in [(x-1, y), (x, y+1), (x+1, y), (x, y-1)]:
+        if i < 0 or j < 0:
+            continue
+        try:
+            children.append(city.map[i][j])
+        except IndexError:
+            continue
+    return children
+
+
+def test_expand_node_matches_old_neighbours():
+    rng = random.Random(0)
+    for h, w in ((1, 1), (1, 5), (4, 1), (6, 7)):
+        rows = [''.join(rng.choice('123456789LGS') for _ in range(w)) for _ in range(h)]
+        city = make_city(rows)
+        for x in range(h):
+            for y in range(w):
+                assert list(city.expand_node(x, y)) == old_expand_node(city, x, y)
+
+
+def test_walls_and_blocked_cells_have_no_edges():
+    city = make_city(["S1#", "111", "11G"], blocked=[(2, 0)])
+    adj = city.adjacency
+    for u in (0 * 3 + 2, 2 * 3 + 0): # the '#' cell and the blocked= cell
+        assert adj.blocked[u]
+        assert len(adj.edges(u)) == 0 # nothing out
+        assert u not in adj.targets # nothing in
+    assert [(n.x, n.y) for n in city.expand_node(0, 1)] == [(1, 1), (0, 0)]
+    assert [(n.x, n.y) for n in city.expand_node(2, 1)] == [(1, 1), (2, 2)]
+
+
+def test_blocked_cells_outside_the_map_are_rejected():
+    for cell in ((-1, 0), (0, 3), (3, 0)):
+        with pytest.raises(ValueError):
+            make_city(["S11", "111", "11G"], blocked=[cell])
+
+
+def test_deepcopy_shares_adjacency_but_not_nodes():
+    city = make_city(["S1#", "1L1", "11G"])
+    clone = copy.deepcopy(city)
+    assert clone.adjacency is city.adjacency
+    for original, copied in zip(city.cells, clone.cells):
+        assert copied is not original
+        assert (copied.x, copied.y, copied.id, copied.value) == (original.x, original.y, original.id, original.value)
+    assert all(clone.map[n.x][n.y] is n for n in clone.cells)
+    assert all(t is clone.map[t.x][t.y] for row in clone.neighbours for t in row)
+    assert clone.node_index[clone.goal_states[0]] is clone.map[2][2]
+
+    clone.map[1][1].value = 1 # editing the copy leaves the original alone
+    assert city.map[1][1].value == 'L'
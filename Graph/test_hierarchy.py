@@ -0,0 +1,115 @@
+import heapq
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__)) # the Graph modules import each other as top-level scripts
+from classes import CityMap
+from hierarchy import HierarchicalMap
+
+
+WALLED = ["S1#111", "11#1#1", "1L#1#G", "111L#1", "###111"] # last map in tests.txt
+
+
+def make_city(rows):
+    return CityMap(len(rows), len(rows[0]), (0, 0), [list(row) for row in rows])
+
+
+def static_cost(path):
+    return 1 + sum(n.cost for n in path.nodes[1:])
+
+
+def dijkstra(city, start, goal, with_cells=False):
+    # Full-grid reference search with the same cost model as route() (start cell counts 1)
+    adj, w = city.adjacency, city.w
+    s, g = start[0] * w + start[1], goal[0] * w + goal[1]
+    dist = {s: 1}
+    parent = {s: None}
+    heap = [(1, s)]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if u == g:
+            if not with_cells:
+                return d
+            cells = []
+            while u is not None:
+                cells.append(u)
+                u = parent[u]
+            return d, cells[::-1]
+        if d > dist[u]:
+            continue
+        for e in adj.edges(u):
+            v = adj.targets[e]
+            if d + adj.costs[e] < dist.get(v, d + adj.costs[e] + 1):
+                dist[v] = d + adj.costs[e]
+                parent[v] = u
+                heapq.heappush(heap, (dist[v], v))
+    return (None, None) if with_cells else None
+
+
+def test_walled_map_route():
+    city = make_city(WALLED)
+    path = HierarchicalMap(city, tile=2).route((0, 0), (2, 5))
+    assert path.cost == 12
+    assert (path.nodes[0].x, path.nodes[0].y) == (0, 0)
+    assert (path.nodes[-1].x, path.nodes[-1].y) == (2, 5)
+    assert all(a - b == 1 for a, b in zip(path.nodes, path.nodes[1:])) # subtraction is Manhattan distance
+    assert all(n.cost is not None for n in path.nodes) # never steps on a wall
+
+
+def test_route_cost_follows_traffic_lights():
+    # S -> (0, 1) -> (1, 1) -> (1, 2) -> L -> G: static cost 20, but the light is red on arrival
+    city = make_city(["S9679", "917LG", "19999"])
+    path = HierarchicalMap(city).route((0, 0), (1, 4))
+    assert static_cost(path) == 20
+    assert path.cost == path.f == 29
+    assert path.goals_reached == city.goal_states
+
+
+def test_matches_dijkstra_with_every_border_cell_as_entrance():
+    rng = random.Random(0)
+    for _ in range(30):
+        h, w = rng.randint(4, 20), rng.randint(4, 20)
+        rows = [''.join(rng.choice('123456789LL##') for _ in range(w)) for _ in range(h)]
+        city = make_city(rows)
+        hmap = HierarchicalMap(city, tile=rng.randint(2, 6), entrance_gap=1)
+        for _ in range(10):
+            start = (rng.randrange(h), rng.randrange(w))
+            goal = (rng.randrange(h), rng.randrange(w))
+            if rows[start[0]][start[1]] == '#' or rows[goal[0]][goal[1]] == '#':
+                continue
+            expected = dijkstra(city, start, goal)
+            if expected is None:
+                with pytest.raises(ValueError):
+                    hmap.route(start, goal)
+            else:
+                assert static_cost(hmap.route(start, goal)) == expected
+
+
+def test_cost_bound_holds_at_default_gap():
+    rng = random.Random(1)
+    for _ in range(20):
+        h, w = rng.randint(10, 60), rng.randint(10, 60)
+        rows = [''.join(rng.choice('123456789LL##') for _ in range(w)) for _ in range(h)]
+        city = make_city(rows)
+        for weight in (1, 1.5):
+            hmap = HierarchicalMap(city, tile=rng.randint(2, 16), weight=weight)
+            for _ in range(10):
+                start = (rng.randrange(h), rng.randrange(w))
+                goal = (rng.randrange(h), rng.randrange(w))
+                if rows[start[0]][start[1]] == '#' or rows[goal[0]][goal[1]] == '#':
+                    continue
+                optimum, cells = dijkstra(city, start, goal, with_cells=True)
+                if optimum is None:
+                    continue
+                crossings = sum(hmap.tile_of(a) != hmap.tile_of(b) for a, b in zip(cells, cells[1:]))
+                assert optimum <= static_cost(hmap.route(start, goal)) <= hmap.cost_bound(optimum, crossings)
+
+
+def test_route_rejects_bad_cells():
+    hmap = HierarchicalMap(make_city(WALLED), tile=2)
+    for cell in ((-1, 0), (0, 6), (5, 0), (0, 2)):
+        with pytest.raises(ValueError):
+            hmap.route(cell, (2, 5))